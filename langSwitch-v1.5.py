@@ -2,19 +2,29 @@
 # -*- coding: utf-8 -*-
 
 from pathlib import Path
+import codecs
+import locale
 import platform
+import queue
+import re
+import shutil
 import sys
 import subprocess
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import unquote
-import urllib.request
-import urllib.error
 import time
 import random
 
+import requests
+from requests.adapters import HTTPAdapter
+
 import questionary
 from questionary import Style
 
-from rich.console import Console
+from rich.console import Console, Group
 from rich.text import Text
 from rich.panel import Panel
 from rich.progress import (
@@ -24,6 +34,7 @@ from rich.progress import (
     TimeRemainingColumn,
     DownloadColumn,
 )
+from rich.rule import Rule
 from rich.table import Table
 
 COMMON_LANGS = [
@@ -64,6 +75,12 @@ MENU_STYLE = Style([
     ("separator", "fg:ansiwhite"),
 ])
 
+BANNER = """  _                                        __  __    _                                      ___            
+ | |   __ _ _ _  __ _ _  _ __ _ __ _ ___  |  \\/  |__| |   __ _ _ _  __ _ _  _ __ _ __ _ ___| __|_ _ __ ___ 
+ | |__/ _` | ' \\/ _` | || / _` / _` / -_) | |\\/| / _| |__/ _` | ' \\/ _` | || / _` / _` / -_) _/ _` / _/ -_)
+ |____\\__,_|_||_\\__, |\\_,_\\__,_\\__, \\___| |_|  |_\\__|____\\__,_|_||_\\__, |\\_,_\\__,_\\__, \\___|_|\\__,_\\__\\___|
+                |___/          |___/                               |___/          |___/                    """
+
 # ============================================================
 # Path handling
 # ============================================================
@@ -93,10 +110,13 @@ class ConsoleLogger:
 
     DELAY_RANGE = (0.1, 0.25)
 
-    def __init__(self, console: Console):
+    def __init__(self, console: Console, delay_enabled: bool = False):
         self.console = console
+        self.delay_enabled = delay_enabled
 
     def _delay(self):
+        if not self.delay_enabled:
+            return
         time.sleep(random.uniform(*self.DELAY_RANGE))
 
     def log(self, level: str, message: str):
@@ -110,7 +130,8 @@ class ConsoleLogger:
         self.console.print(Panel(text, title=title, border_style=color))
         self._delay()
 
-logger = ConsoleLogger(console)
+# Cinematic per-line delay is opt-in (--slow)
+logger = ConsoleLogger(console, delay_enabled="--slow" in sys.argv)
 log = logger.log
 panel = logger.panel
 
@@ -147,12 +168,28 @@ DOWNLOAD_ROOT = EXE_DIR / "downloads"
 APPX_DIR = DOWNLOAD_ROOT / "appx"
 CAB_DIR = DOWNLOAD_ROOT / "cab"
 
-FOD_FEATURE_KEYWORDS = [
+# concurrent fetches from the same host (must fit in the session pool)
+DOWNLOAD_WORKERS = 6
+
+FOD_FEATURE_KEYWORDS = (
     "languagefeatures-basic-",
     "languagefeatures-ocr-",
     "languagefeatures-texttospeech-",
     "languagefeatures-fonts-",
-]
+)
+
+# single alternation over the keywords, spliced into the per-run classifier
+FOD_FEATURE_ALT = "|".join(re.escape(k) for k in FOD_FEATURE_KEYWORDS)
+
+WINPE_RX = re.compile(r"winpe|windows preinstallation environment")
+
+# ============================================================
+# HTTP session (shared keep-alive pool for probe + downloads)
+# ============================================================
+
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+SESSION.headers["User-Agent"] = "Mozilla/5.0"
 
 # ============================================================
 # Internet check
@@ -161,13 +198,8 @@ FOD_FEATURE_KEYWORDS = [
 def check_internet():
     log("INFO", "Checking internet connectivity")
     try:
-        req = urllib.request.Request(
-            "https://archive.org",
-            method="HEAD",
-            headers={"User-Agent": "Mozilla/5.0"},
-        )
-        with urllib.request.urlopen(req, timeout=5):
-            pass
+        r = SESSION.head("https://archive.org", timeout=5, allow_redirects=True)
+        r.raise_for_status()
         log("SUCCESS", "Internet connectivity OK")
     except Exception:
         fatal("No internet connection detected")
@@ -177,14 +209,20 @@ def check_internet():
 # ============================================================
 
 def load_all_lines(paths):
-    lines = []
+    # stream each file line by line, deduping in first-seen order.
+    # Returns (raw, unquoted+lowercased) pairs so later passes never re-decode.
+    seen = set()
+    out = []
     for p in paths:
         if not p.exists():
             fatal(f"Missing file: {p}")
-        lines.extend(
-            l.strip() for l in p.read_text(encoding="utf-8").splitlines() if l.strip()
-        )
-    return list(dict.fromkeys(lines))
+        with p.open("r", encoding="utf-8", buffering=1 << 20) as fh:
+            for l in fh:
+                s = l.strip()
+                if s and s not in seen:
+                    seen.add(s)
+                    out.append((s, unquote(s).lower()))
+    return out
 
 def detect_arch():
     m = platform.machine().lower()
@@ -196,18 +234,67 @@ def detect_arch():
         return "arm64", "arm64"
     fatal(f"Unsupported architecture: {m}")
 
-def extract_languages(lines):
-    langs = set()
-    for l in lines:
-        u = unquote(l).lower()
-        if "/localexperiencepack/" in u:
-            parts = u.split("/localexperiencepack/")[1].split("/")
-            if len(parts) > 1:
-                langs.add(parts[0])
-    return sorted(langs)
+# one classified URL: lang is the tag found in the path, kind is one of
+# lep (other LEP file), lep_appx, lep_xml, clp_cab, fod_cab
+Row = namedtuple("Row", "raw lang kind")
+
+def build_classifier(arch_path, arch_token):
+    # one compiled pass over a lowercased, unquoted URL that both recognises
+    # the package kind and captures its language tag
+    return re.compile(
+        r"/localexperiencepack/(?P<lep>[^/]+)/(?:.*?(?P<lep_file>\.appx|license\.xml)$)?"
+        rf"|microsoft-windows-client-language-pack_{arch_path}_(?P<clp>[^/]+?)\.cab"
+        rf"|microsoft-windows-(?:{FOD_FEATURE_ALT})(?P<fod>[^/]*?)-package[^/]*~{arch_token}~~\.cab"
+    )
+
+def classify_lines(lines, arch_path, arch_token):
+    # single scan shared by the language menu and the download filter
+    is_winpe = WINPE_RX.search
+    match = build_classifier(arch_path, arch_token).search
 
-def is_winpe(l):
-    return "winpe" in l or "windows preinstallation environment" in l
+    rows = []
+    for raw, u in lines:
+        if is_winpe(u):
+            continue
+        m = match(u)
+        if not m:
+            continue
+        if m["lep"]:
+            ext = m["lep_file"]
+            kind = "lep" if ext is None else ("lep_appx" if ext == ".appx" else "lep_xml")
+            rows.append(Row(raw, m["lep"], kind))
+        elif m["clp"]:
+            rows.append(Row(raw, m["clp"], "clp_cab"))
+        else:
+            rows.append(Row(raw, m["fod"], "fod_cab"))
+    return rows
+
+def extract_languages(rows):
+    return sorted({r.lang for r in rows if r.kind.startswith("lep")})
+
+OUTPUT_READ_SIZE = 1 << 16
+OUTPUT_FLUSH_LINES = 50
+OUTPUT_FLUSH_SECS = 0.05
+
+def _pump_output(stream, q):
+    # reader thread: decode raw chunks, split on \n / \r (DISM progress) and
+    # queue complete lines; None marks EOF
+    decoder = codecs.getincrementaldecoder(
+        locale.getpreferredencoding(False)
+    )(errors="replace")
+    pending = ""
+    while True:
+        chunk = stream.read1(OUTPUT_READ_SIZE)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        for line in lines:
+            q.put(line)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        q.put(pending)
+    q.put(None)
 
 def run(cmd):
     log("INFO", f"Running: {' '.join(cmd)}")
@@ -216,19 +303,58 @@ def run(cmd):
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
+        bufsize=OUTPUT_READ_SIZE,
     )
 
-    for line in p.stdout:
-        line = line.rstrip()
-        if line:
-            console.print(f"[dim]{line}[/dim]")
+    q = queue.Queue()
+    threading.Thread(target=_pump_output, args=(p.stdout, q), daemon=True).start()
+
+    # print in batches (every N lines or T seconds) with markup parsing off
+    batch = []
+    deadline = time.monotonic() + OUTPUT_FLUSH_SECS
+    done = False
+    while not done:
+        try:
+            line = q.get(timeout=max(0, deadline - time.monotonic()))
+            if line is None:
+                done = True
+            else:
+                line = line.rstrip()
+                if line:
+                    batch.append(line)
+        except queue.Empty:
+            pass
+
+        if done or len(batch) >= OUTPUT_FLUSH_LINES or time.monotonic() >= deadline:
+            if batch:
+                console.print("\n".join(batch), style="dim", markup=False, highlight=False)
+                batch.clear()
+            deadline = time.monotonic() + OUTPUT_FLUSH_SECS
 
     ret = p.wait()
     if ret != 0:
         fatal(f"Command failed with exit code {ret}")
 
+# console-less child processes on Windows (no-op elsewhere)
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+def run_silent(cmd, check=True):
+    # for commands whose output is irrelevant: no pipes, no reader loop
+    log("INFO", f"Running: {' '.join(cmd)}")
+
+    ret = subprocess.run(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        creationflags=CREATE_NO_WINDOW,
+    ).returncode
+
+    if check and ret != 0:
+        fatal(f"Command failed with exit code {ret}")
+
+    return ret
+
 
 # ============================================================
 # UI Helpers
@@ -246,22 +372,24 @@ def show_language_table(langs):
 
 
 def select_language(langs):
-    langs = sorted(set(langs))
-    common = [l for l in COMMON_LANGS if l in langs]
-    others = [l for l in langs if l not in common]
+    # langs arrives sorted and unique from extract_languages
+    lang_set = set(langs)
+    common = [l for l in COMMON_LANGS if l in lang_set]
+    common_set = set(common)
 
-    # build label → value mapping
-    def label(l):
-        return f"{l} — {LANG_LABELS.get(l, 'Unknown')}"
+    # labels are built once; Choice objects are created fresh for every prompt
+    # because questionary stores assigned shortcut keys on them.
+    # select() returns the tag (value), not the label.
+    titles = {l: f"{l} — {LANG_LABELS.get(l, 'Unknown')}" for l in langs}
 
-    common_choices = {label(l): l for l in common}
-    all_choices = {label(l): l for l in langs}
+    def choices_for(tags):
+        return [questionary.Choice(title=titles[l], value=l) for l in tags]
 
     while True:
         choice = questionary.select(
             "Select language to install:",
             choices=[
-                *common_choices.keys(),
+                *choices_for(common),
                 questionary.Separator(),
                 "Show all languages",
                 "Exit",
@@ -269,18 +397,18 @@ def select_language(langs):
             style=MENU_STYLE,
         ).ask()
 
-        if choice in common_choices:
-            return common_choices[choice]
+        if choice in common_set:
+            return choice
 
         if choice == "Show all languages":
             sub = questionary.select(
                 "All available languages:",
-                choices=[*all_choices.keys(), "Back"],
+                choices=[*choices_for(langs), "Back"],
                 style=MENU_STYLE,
             ).ask()
 
             if sub and sub != "Back":
-                return all_choices[sub]
+                return sub
 
         if choice in (None, "Exit"):
             fatal("Cancelled by user")
@@ -290,39 +418,116 @@ def select_language(langs):
 # Download with Progress
 # ============================================================
 
-def download_file(url, dest: Path):
+COPY_BUFSIZE = 1024 * 1024
+
+# set when the download batch fails or is interrupted; in-flight copies stop
+DOWNLOAD_ABORT = threading.Event()
+
+# file wrapper that advances a progress task on every write
+class ProgressWriter:
+    def __init__(self, f, prog: Progress, task):
+        self.f = f
+        self.prog = prog
+        self.task = task
+
+    def write(self, b):
+        if DOWNLOAD_ABORT.is_set():
+            raise RuntimeError("download aborted")
+        self.f.write(b)
+        self.prog.update(self.task, advance=len(b))
+        return len(b)
+
+def remote_size(url):
+    # HEAD first; some servers reject it, so fall back to a GET that only
+    # reads the headers
+    r = SESSION.head(url, timeout=10, allow_redirects=True)
+    if r.status_code == 405:
+        with SESSION.get(url, stream=True, timeout=10) as g:
+            r = g
+    r.raise_for_status()
+    length = r.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+def download_file(url, dest: Path, prog: Progress):
     dest.parent.mkdir(parents=True, exist_ok=True)
 
     if dest.exists():
-        log("DEBUG", f"Already exists: {dest.name}")
-        return
+        try:
+            size = remote_size(url)
+        except requests.RequestException:
+            log("WARN", f"Could not verify {dest.name}, using cached copy")
+            return
+
+        if size is None:
+            log("DEBUG", f"Already exists: {dest.name} (size unknown, using cached copy)")
+            return
+
+        if size == dest.stat().st_size:
+            log("DEBUG", f"Already exists: {dest.name} (cached, size match)")
+            return
+
+        log("WARN", f"Re-downloading {dest.name} (size mismatch)")
 
     log("INFO", f"Downloading {dest.name}")
 
-    with urllib.request.urlopen(url) as r:
+    with SESSION.get(url, stream=True, timeout=30) as r:
+        r.raise_for_status()
         length = r.headers.get("Content-Length")
         total = int(length) if length and length.isdigit() else None
+        if r.headers.get("Content-Encoding"):
+            # Content-Length counts encoded bytes; progress counts decoded ones
+            total = None
 
-        with Progress(
-            TextColumn("{task.description}"),
-            BarColumn(),
-            DownloadColumn(),
-            TimeRemainingColumn(),
-            transient=True,
-        ) as prog:
-
-            task = prog.add_task(dest.name, total=total)
+        task = prog.add_task(dest.name, total=total)
 
+        # let urllib3 undo any Content-Encoding, then copy in 1 MiB blocks
+        r.raw.decode_content = True
+        try:
             with open(dest, "wb") as f:
-                while True:
-                    chunk = r.read(1024 * 128)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    prog.update(task, advance=len(chunk))
+                shutil.copyfileobj(r.raw, ProgressWriter(f, prog, task), COPY_BUFSIZE)
+        except BaseException:
+            # never leave a partial file behind to be picked up as cached
+            dest.unlink(missing_ok=True)
+            raise
+
+        prog.remove_task(task)
+
+    log("SUCCESS", f"Downloaded {dest.name}")
+
+def download_all(jobs):
+    # Rich allows a single live display, so all workers share one Progress
+    failure = None
+
+    with Progress(
+        TextColumn("{task.description}"),
+        BarColumn(),
+        DownloadColumn(),
+        TimeRemainingColumn(),
+        transient=True,
+        console=console,
+    ) as prog:
+        ex = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+        futures = {ex.submit(download_file, url, dest, prog): dest for url, dest in jobs}
+
+        # stop at the first failure (or Ctrl-C) like the old serial loop did
+        try:
+            for f in as_completed(futures):
+                try:
+                    f.result()
+                except Exception as e:
+                    failure = f"Download failed for {futures[f].name}: {e}"
+                    break
+        except KeyboardInterrupt:
+            failure = "Download cancelled by user"
 
-    #log("SUCCESS", f"Downloaded {dest.name}")
-    log("SUCCESS", f"Download complete.")
+        if failure:
+            DOWNLOAD_ABORT.set()
+            ex.shutdown(wait=False, cancel_futures=True)
+        else:
+            ex.shutdown()
+
+    if failure:
+        fatal(failure)
 
 def prompt_reboot():
     try:
@@ -332,10 +537,13 @@ def prompt_reboot():
 
     if ans in ("", "y", "yes"):
         log("INFO", "Rebooting system now")
-        subprocess.run(["shutdown", "/r", "/t", "0"], check=False)
+        ret = run_silent(["shutdown", "/r", "/t", "0"], check=False)
+        if ret == 0:
+            return
+        log("WARN", f"Reboot failed (shutdown exit code {ret}). Please reboot manually to apply language changes.")
     else:
         log("WARN", "Reboot skipped. Please reboot manually to apply language changes.")
-        pause_exit(0)
+    pause_exit(0)
 
 # ============================================================
 # Main
@@ -358,29 +566,23 @@ def main():
 
     check_internet()
 
-    log("INFO", "Loading input URL lists")
-    lines = load_all_lines(INPUT_FILES)
-
     arch_path, arch_token = detect_arch()
     log("INFO", f"Detected architecture: {arch_path}")
 
-    time.sleep(1.2)
-    console.clear()
-    console.print("\n")
-
-    console.print(
-"""  _                                        __  __    _                                      ___            
- | |   __ _ _ _  __ _ _  _ __ _ __ _ ___  |  \\/  |__| |   __ _ _ _  __ _ _  _ __ _ __ _ ___| __|_ _ __ ___ 
- | |__/ _` | ' \\/ _` | || / _` / _` / -_) | |\\/| / _| |__/ _` | ' \\/ _` | || / _` / _` / -_) _/ _` / _/ -_)
- |____\\__,_|_||_\\__, |\\_,_\\__,_\\__, \\___| |_|  |_\\__|____\\__,_|_||_\\__, |\\_,_\\__,_\\__, \\___|_|\\__,_\\__\\___|
-                |___/          |___/                               |___/          |___/                    """,
-        style="yellow",
-    )
-
-    console.rule(" iam5 ")
-    console.print("\n")
+    log("INFO", "Loading input URL lists")
+    rows = classify_lines(load_all_lines(INPUT_FILES), arch_path, arch_token)
 
-    langs = extract_languages(lines)
+    # one composed renderable: a single styling pass and write, while still
+    # going through Rich's legacy Windows console path
+    console.clear()
+    console.print(Group(
+        Text("\n"),
+        Text(BANNER, style="yellow"),
+        Rule(" iam5 "),
+        Text("\n"),
+    ))
+
+    langs = extract_languages(rows)
     if not langs:
         fatal("No languages found")
 
@@ -419,53 +621,35 @@ def main():
         color="green",
     )
 
-    found = []
-
-    for line in lines:
-        u = unquote(line)
-        l = u.lower()
-
-        if is_winpe(l):
-            continue
-
-        if f"/localexperiencepack/{lang}/" in l:
-            if l.endswith(".appx") or l.endswith("license.xml"):
-                found.append(line)
-            continue
-
-        if f"microsoft-windows-client-language-pack_{arch_path}_{lang}.cab" in l:
-            found.append(line)
-            continue
-
-        if (
-            "microsoft-windows-languagefeatures-" in l
-            and f"-{lang}-package" in l
-            and f"~{arch_token}~~.cab" in l
-        ):
-            for k in FOD_FEATURE_KEYWORDS:
-                if k in l:
-                    found.append(line)
-                    break
+    # (url, file name) — name is decoded once and reused below
+    found = [
+        (r.raw, Path(unquote(r.raw)).name)
+        for r in rows
+        if r.lang == lang and r.kind != "lep"
+    ]
 
     if not found:
         fatal("No matching files found")
 
-    file_list = "\n".join(f"• {Path(unquote(f)).name}" for f in found)
+    file_list = "\n".join(f"• {name}" for _, name in found)
     panel(file_list, title="Files to download", color="cyan")
 
     appx_files = []
     cab_files = []
+    jobs = []
 
-    for url in found:
-        name = Path(unquote(url)).name
-        if name.lower().endswith(".appx") or name.lower() == "license.xml":
+    # destinations are assigned up front so install order matches `found`
+    for url, name in found:
+        low = name.lower()
+        if low.endswith(".appx") or low == "license.xml":
             dest = APPX_DIR / name
-            download_file(url, dest)
             appx_files.append(dest)
         else:
             dest = CAB_DIR / name
-            download_file(url, dest)
             cab_files.append(dest)
+        jobs.append((url, dest))
+
+    download_all(jobs)
 
     if DRY_RUN:
         log("WARN", "Dry-run enabled: installation skipped")
@@ -555,9 +739,7 @@ def main():
 
     log("INFO", "Applying language to system login / welcome screen")
 
-    ps_cmd_login = f"""
-$xml = @"
-<gs:GlobalizationServices xmlns:gs="urn:longhornGlobalizationUnattend">
+    login_xml = f"""<gs:GlobalizationServices xmlns:gs="urn:longhornGlobalizationUnattend">
   <gs:UserList>
     <gs:User UserID="Current"/>
     <gs:User UserID="System"/>
@@ -566,21 +748,13 @@ $xml = @"
     <gs:UILanguage Value="{lang}"/>
   </gs:UILanguagePreferences>
 </gs:GlobalizationServices>
-"@
-
-$path = "$env:TEMP\\intl.xml"
-$xml | Out-File -Encoding UTF8 $path
-
-control.exe "intl.cpl,,/f:$path"
 """
 
+    # written in-process; only control.exe needs to be launched
+    xml_path = Path(tempfile.gettempdir()) / "intl.xml"
+    xml_path.write_text(login_xml, encoding="utf-8")
 
-    run([
-        "powershell",
-        "-NoProfile",
-        "-ExecutionPolicy", "Bypass",
-        "-Command", ps_cmd_login,
-    ])
+    run_silent(["control.exe", f"intl.cpl,,/f:{xml_path}"])
     console.print("\n")
     console.rule(" FINISHED ")
     console.print("\n")